@@ -3,6 +3,7 @@ import pandas as pd
 import numpy as np
 import plotly.graph_objects as go
 import plotly.express as px
+import pyarrow.parquet as pq
 from datetime import datetime, timedelta
 import os
 
@@ -23,7 +24,7 @@ st.markdown("""
     .stSidebar {
         background-color: #1E2329;
     }
-    .patient-info-card {
+    .st-key-patient_info_card {
         background-color: #1E2329;
         padding: 20px;
         border-radius: 10px;
@@ -55,31 +56,85 @@ st.title("🫁 ARDS Patient Dashboard")
 st.caption("Visualizing respiratory support, interventions, and outcomes for ARDS patients")
 st.markdown("---")
 
-# Define data paths
-DATA_PATH = '/Users/kavenchhikara/Desktop/projects/SCCM/SCCM-Team2/ards_analysis/data'
+# Define data paths (override with the ARDS_DATA_PATH environment variable)
+DATA_PATH = os.environ.get('ARDS_DATA_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data'))
 
-def create_patient_timeline(patient_ts, patient_static):
-    """Create the main patient timeline visualization similar to the screenshot"""
+# Neuromuscular blocker infusion columns
+NMB_COLS = ['cisatracurium_dose', 'vecuronium_dose', 'rocuronium_dose', 'atracurium_dose', 'pancuronium_dose']
+
+# Columns coerced to float once at load time so the render path never re-parses them
+NUMERIC_COLS = ['pao2', 'fio2_set', 'spo2', 'peep_set', 'new_tracheostomy'] + NMB_COLS
+
+# Columns read from each parquet file (others are never used by the dashboard)
+TS_COLUMNS = [
+    'hospitalization_id', 'recorded_dttm', 'icu_in_time', 'ARDS_onset_dttm',
+    'hours_from_icu_admission', 'hours_from_ards_onset', 'days_from_admission', 'prone_flag'
+] + NUMERIC_COLS
+STATIC_COLUMNS = [
+    'hospitalization_id', 'admission_datetime', 'discharge_datetime', 'age_at_admission', 'sex',
+    'ethnicity', 'race', 'hospital_admit_source', 'disposition_category', 'mortality',
+    'icu_los_days', 'hospital_los_days', 'ventilator_free_days_28'
+]
+
+# Low-cardinality string columns loaded as pandas categoricals
+CATEGORY_COLUMNS = ['prone_flag', 'sex', 'ethnicity', 'race', 'hospital_admit_source', 'disposition_category']
+
+# Maximum number of points sent to the browser per line trace
+MAX_TRACE_POINTS = 1000
+
+def downsample_lttb(x, y, n_out=MAX_TRACE_POINTS):
+    """Downsample a series with Largest-Triangle-Three-Buckets, keeping its visual shape"""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+    if n <= n_out or n_out < 3:
+        return x, y
+    
+    # Always keep the first and last points; pick one point per bucket in between
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    keep = np.empty(n_out, dtype=int)
+    keep[0], keep[-1] = 0, n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        
+        # Choose the point forming the largest triangle with the previous pick and the next bucket's mean
+        area = np.abs((x[prev] - avg_x) * (y[start:end] - y[prev]) - (x[prev] - x[start:end]) * (avg_y - y[prev]))
+        prev = start + int(area.argmax())
+        keep[i + 1] = prev
     
-    # Convert hours to days for display
-    patient_ts['days_from_admission'] = patient_ts['hours_from_icu_admission'] / 24
+    return x[keep], y[keep]
+
+@st.cache_resource
+def _build_timeline_fig(hosp_id, _patient_ts, _patient_static, _summary):
+    """Build the patient timeline figure, cached per hospitalization ID.
     
-    # Create the main figure
-    fig = go.Figure()
+    The underscore-prefixed arguments are excluded from the cache key; the loaded
+    data does not change within a session, so hosp_id identifies the figure.
+    The cached Figure is shared across reruns, so callers must not modify it.
+    """
+    patient_ts = _patient_ts
+    patient_static = _patient_static
+    summary = _summary
     
-    # Calculate P/F ratio or S/F ratio for respiratory status
-    patient_ts['pf_ratio'] = pd.to_numeric(patient_ts['pao2'], errors='coerce') / pd.to_numeric(patient_ts['fio2_set'], errors='coerce')
-    patient_ts['sf_ratio'] = pd.to_numeric(patient_ts['spo2'], errors='coerce') / pd.to_numeric(patient_ts['fio2_set'], errors='coerce')
+    # Collect traces, shapes and annotations, then build the figure in one go
+    traces = []
     
-    # Use P/F if available, otherwise S/F
-    patient_ts['respiratory_ratio'] = patient_ts['pf_ratio'].fillna(patient_ts['sf_ratio'])
+    # Work on raw arrays; Plotly only needs the 1-D x/y values
+    days = patient_ts['days_from_admission'].to_numpy()
+    ratio = patient_ts['respiratory_ratio'].to_numpy()
+    peep = patient_ts['peep_set'].to_numpy()
     
     # Plot P/F or S/F ratio (main line)
-    ratio_data = patient_ts.dropna(subset=['respiratory_ratio', 'days_from_admission'])
-    if len(ratio_data) > 0:
-        fig.add_trace(go.Scatter(
-            x=ratio_data['days_from_admission'],
-            y=ratio_data['respiratory_ratio'],
+    ratio_mask = ~np.isnan(ratio) & ~np.isnan(days)
+    if ratio_mask.any():
+        ratio_x, ratio_y = downsample_lttb(days[ratio_mask], ratio[ratio_mask])
+        traces.append(go.Scattergl(
+            x=ratio_x,
+            y=ratio_y,
             mode='lines+markers',
             name='S/F Ratio',
             line=dict(color='#FFFFFF', width=3),  # White line for visibility
@@ -88,14 +143,12 @@ def create_patient_timeline(patient_ts, patient_static):
         ))
     
     # Plot PEEP (secondary y-axis)
-    peep_data = patient_ts.dropna(subset=['peep_set', 'days_from_admission'])
-    peep_data['peep_numeric'] = pd.to_numeric(peep_data['peep_set'], errors='coerce')
-    peep_data = peep_data.dropna(subset=['peep_numeric'])
-    
-    if len(peep_data) > 0:
-        fig.add_trace(go.Scatter(
-            x=peep_data['days_from_admission'],
-            y=peep_data['peep_numeric'],
+    peep_mask = ~np.isnan(peep) & ~np.isnan(days)
+    if peep_mask.any():
+        peep_x, peep_y = downsample_lttb(days[peep_mask], peep[peep_mask])
+        traces.append(go.Scattergl(
+            x=peep_x,
+            y=peep_y,
             mode='lines+markers',
             name='PEEP',
             line=dict(color='#00BFFF', width=3),  # Bright blue for visibility
@@ -106,11 +159,15 @@ def create_patient_timeline(patient_ts, patient_static):
         ))
     
     # Add intervention markers
-    add_intervention_markers(fig, patient_ts, patient_static)
+    marker_traces, shapes, annotations = build_intervention_markers(patient_ts)
+    traces.extend(marker_traces)
     
     # Add critical thresholds for S/F ratio ARDS categories
-    fig.add_hline(y=235, line_dash="dash", line_color="orange", annotation_text="S/F = 235 (Mild/Moderate ARDS)")
-    fig.add_hline(y=148, line_dash="dash", line_color="red", annotation_text="S/F = 148 (Moderate/Severe ARDS)")
+    for threshold, color, text in [(235, "orange", "S/F = 235 (Mild/Moderate ARDS)"),
+                                   (148, "red", "S/F = 148 (Moderate/Severe ARDS)")]:
+        shapes.append(hline_shape(threshold, dash="dash", color=color))
+        annotations.append(dict(text=text, x=1, xref="x domain", y=threshold, yref="y",
+                                xanchor="right", yanchor="bottom", showarrow=False))
     
     # Calculate ICU discharge time for timeline
     icu_discharge_day = (patient_static.get('discharge_datetime') - patient_ts['icu_in_time'].iloc[0]).total_seconds() / (24 * 3600) if hasattr(patient_static.get('discharge_datetime'), 'total_seconds') else None
@@ -120,11 +177,12 @@ def create_patient_timeline(patient_ts, patient_static):
     
     # Add discharge marker
     if icu_discharge_day and icu_discharge_day > 0:
-        fig.add_vline(x=icu_discharge_day, line_dash="solid", line_color="green", 
-                     annotation_text="ICU Discharge", annotation_position="top")
+        shapes.append(vline_shape(icu_discharge_day, dash="solid", color="green"))
+        annotations.append(dict(text="ICU Discharge", x=icu_discharge_day, xref="x", y=1, yref="y domain",
+                                xanchor="center", yanchor="bottom", showarrow=False))
     
     # Configure layout with transparent background
-    fig.update_layout(
+    layout = go.Layout(
         title=dict(
             text=f"Patient {patient_static['hospitalization_id']} - Respiratory Timeline",
             font=dict(size=24, color='white')
@@ -135,7 +193,7 @@ def create_patient_timeline(patient_ts, patient_static):
             gridcolor='rgba(128,128,128,0.3)',
             gridwidth=1,
             tickfont=dict(color='white', size=14),
-            range=[0, max(patient_ts['days_from_admission'].max(), icu_discharge_day, 7)]
+            range=[0, max(summary['days_max'], icu_discharge_day, 7)]
         ),
         yaxis=dict(
             title=dict(text="S/F Ratio", font=dict(color='white', size=24)),
@@ -144,7 +202,7 @@ def create_patient_timeline(patient_ts, patient_static):
             gridcolor='rgba(128,128,128,0.3)',
             gridwidth=1,
             tickfont=dict(color='white', size=14),
-            range=[0, max(500, patient_ts['respiratory_ratio'].max() * 1.1) if patient_ts['respiratory_ratio'].notna().any() else 500]
+            range=[0, max(500, summary['ratio_max'] * 1.1) if pd.notna(summary['ratio_max']) else 500]
         ),
         yaxis2=dict(
             title=dict(text="PEEP (cmH2O)", font=dict(color='white', size=24)),
@@ -165,9 +223,17 @@ def create_patient_timeline(patient_ts, patient_static):
             bordercolor='white',
             borderwidth=1,
             font=dict(color='white', size=14)
-        )
+        ),
+        shapes=shapes,
+        annotations=annotations
     )
     
+    return go.Figure(data=traces, layout=layout)
+
+def create_patient_timeline(patient_ts, patient_static, summary):
+    """Create the main patient timeline visualization similar to the screenshot"""
+    
+    fig = _build_timeline_fig(patient_static['hospitalization_id'], patient_ts, patient_static, summary)
     st.plotly_chart(fig, use_container_width=True)
     
     # Additional summary metrics
@@ -178,80 +244,88 @@ def create_patient_timeline(patient_ts, patient_static):
         st.metric("ICU Days", f"{icu_days:.1f}")
     
     with col2:
-        min_ratio = patient_ts['respiratory_ratio'].min() if patient_ts['respiratory_ratio'].notna().any() else 0
+        min_ratio = summary['ratio_min'] if pd.notna(summary['ratio_min']) else 0
         st.metric("Lowest S/F", f"{min_ratio:.0f}")
     
     with col3:
-        max_peep = peep_data['peep_numeric'].max() if len(peep_data) > 0 else 0
+        max_peep = summary['peep_max'] if pd.notna(summary['peep_max']) else 0
         st.metric("Peak PEEP", f"{max_peep:.1f}")
     
     with col4:
-        nmb_hours = ((patient_ts[['cisatracurium_dose', 'vecuronium_dose', 'rocuronium_dose', 'atracurium_dose', 'pancuronium_dose']] > 0).any(axis=1)).sum()
+        nmb_hours = summary['nmb_hours']
         st.metric("NMB Hours", f"{nmb_hours}")
 
-def add_intervention_markers(fig, patient_ts, patient_static):
-    """Add intervention markers to the timeline"""
+def vline_shape(x, **line):
+    """Vertical line shape spanning the full plot height at x (in days)"""
+    return dict(type="line", x0=x, x1=x, xref="x", y0=0, y1=1, yref="y domain", line=line)
+
+def hline_shape(y, **line):
+    """Horizontal line shape spanning the full plot width at y (S/F ratio axis)"""
+    return dict(type="line", x0=0, x1=1, xref="x domain", y0=y, y1=y, yref="y", line=line)
+
+def marker_label(text, x):
+    """Annotation placed at the top right of a vertical marker line"""
+    return dict(text=text, x=x, xref="x", y=1, yref="y domain", xanchor="left", yanchor="top",
+                showarrow=False, font=dict(color="white", size=14))
+
+def build_intervention_markers(patient_ts):
+    """Build intervention marker traces, shapes and annotations for the timeline"""
+    traces, shapes, annotations = [], [], []
+    
+    # Select event days with column masks rather than copying row subsets of the frame
+    days = patient_ts['days_from_admission'].to_numpy()
     
     # ARDS onset
-    ards_onset_day = patient_ts['hours_from_ards_onset'].notna().any()
-    if ards_onset_day:
-        ards_day = patient_ts[patient_ts['hours_from_ards_onset'].notna()]['days_from_admission'].iloc[0]
-        fig.add_vline(x=ards_day, line_dash="dot", line_color="#FFA500", line_width=3,
-                     annotation=dict(text="ARDS Onset", font=dict(color="white", size=14)))
+    ards_onset_mask = patient_ts['hours_from_ards_onset'].notna().to_numpy()
+    if ards_onset_mask.any():
+        ards_day = float(days[ards_onset_mask][0])
+        shapes.append(vline_shape(ards_day, dash="dot", color="#FFA500", width=3))
+        annotations.append(marker_label("ARDS Onset", ards_day))
     
-    # Proning events - check for both numeric 1 and string values "prone"/"Prone"
-    if 'prone_flag' in patient_ts.columns:
-        # Create a binary prone position flag
-        patient_ts['prone_position_flag'] = 0
-        
-        # Check for numeric 1
-        numeric_prone = pd.to_numeric(patient_ts['prone_flag'], errors='coerce') == 1
-        
-        # Check for string values "prone" or "Prone"
-        string_prone = patient_ts['prone_flag'].astype(str).str.lower() == 'prone'
-        
-        # Combine both conditions
-        patient_ts['prone_position_flag'] = (numeric_prone | string_prone).astype(int)
-        
-        # Get prone events
-        prone_events = patient_ts[patient_ts['prone_position_flag'] == 1]
-        
-        if len(prone_events) > 0:
-            prone_days = prone_events['days_from_admission'].tolist()
-            fig.add_scatter(
-                x=prone_days,
-                y=[300] * len(prone_days),  # Fixed height for prone markers
-                mode='markers',
-                marker=dict(symbol='square', size=15, color='#00FF00', line=dict(color='white', width=2)),
-                name='Prone Position',
-                showlegend=True
-            )
+    # Proning events (flag precomputed in load_data)
+    prone_days = days[patient_ts['_prone_flag'].to_numpy()].tolist()
+    if len(prone_days) > 0:
+        traces.append(go.Scattergl(
+            x=prone_days,
+            y=[300] * len(prone_days),  # Fixed height for prone markers
+            mode='markers',
+            marker=dict(symbol='square', size=15, color='#00FF00', line=dict(color='white', width=2)),
+            name='Prone Position',
+            showlegend=True
+        ))
     
-    # Neuromuscular blockade
-    nmb_cols = ['cisatracurium_dose', 'vecuronium_dose', 'rocuronium_dose', 'atracurium_dose', 'pancuronium_dose']
-    nmb_events = patient_ts[(patient_ts[nmb_cols] > 0).any(axis=1)]
-    if len(nmb_events) > 0:
-        nmb_days = nmb_events['days_from_admission'].tolist()
-        fig.add_scatter(
+    # Neuromuscular blockade (flag precomputed in load_data)
+    nmb_days = days[patient_ts['_nmb_flag'].to_numpy()].tolist()
+    if len(nmb_days) > 0:
+        traces.append(go.Scattergl(
             x=nmb_days,
             y=[350] * len(nmb_days),  # Fixed height for NMB markers
             mode='markers',
             marker=dict(symbol='diamond', size=12, color='#FF00FF', line=dict(color='white', width=2)),
             name='Neuromuscular Blockade',
             showlegend=True
-        )
+        ))
     
     # Tracheostomy
-    trach_events = patient_ts[pd.to_numeric(patient_ts['new_tracheostomy'], errors='coerce') == 1]
-    if len(trach_events) > 0:
-        trach_day = trach_events['days_from_admission'].iloc[0]
-        fig.add_vline(x=trach_day, line_dash="solid", line_color="#8A2BE2", line_width=3,
-                     annotation=dict(text="Tracheostomy", font=dict(color="white", size=14)))
+    trach_days = days[patient_ts['new_tracheostomy'].to_numpy() == 1]
+    if len(trach_days) > 0:
+        trach_day = float(trach_days[0])
+        shapes.append(vline_shape(trach_day, dash="solid", color="#8A2BE2", width=3))
+        annotations.append(marker_label("Tracheostomy", trach_day))
+    
+    return traces, shapes, annotations
 
-# Load data with caching
-@st.cache_data
+# Load data with caching. cache_resource shares one in-memory copy across reruns
+# and sessions instead of unpickling the cohort on every cache hit, so the
+# returned frames must be treated as read-only.
+@st.cache_resource
 def load_data():
-    """Load time series and static data, filter to ARDS patients only"""
+    """Load time series and static data, filter to ARDS patients only.
+    
+    Returns a dict mapping hospitalization_id to that patient's time series
+    (sorted by recorded_dttm), the static table indexed by hospitalization_id,
+    and a dict of per-patient summary metrics.
+    """
     try:
         # Load time series data with engine specification
         ts_path = os.path.join(DATA_PATH, 'time_series_analysis_table.parquet')
@@ -260,14 +334,31 @@ def load_data():
         # Check if files exist
         if not os.path.exists(ts_path):
             st.error(f"Time series file not found at: {ts_path}")
-            return None, None
+            return None, None, None
         if not os.path.exists(static_path):
             st.error(f"Static file not found at: {static_path}")
-            return None, None
+            return None, None, None
             
-        # Load with explicit engine
-        ts_data = pd.read_parquet(ts_path, engine='pyarrow')
-        static_data = pd.read_parquet(static_path, engine='pyarrow')
+        # Time offset and ARDS flag columns are precomputed by prepare_data.py
+        ts_schema_names = pq.read_schema(ts_path).names
+        if 'days_from_admission' not in ts_schema_names or 'is_ards' not in ts_schema_names:
+            st.error(f"Precomputed columns missing from {ts_path}. Run `python prepare_data.py` first.")
+            return None, None, None
+        
+        # Only read the columns the dashboard uses (optional ones may be absent)
+        ts_columns = [col for col in TS_COLUMNS if col in ts_schema_names]
+        static_columns = [col for col in STATIC_COLUMNS if col in pq.read_schema(static_path).names]
+        
+        # Load with pyarrow, dictionary-encoding low-cardinality strings as categoricals.
+        # Only ARDS patients' rows are read from the time series file.
+        # Files are memory-mapped so repeated cold loads are served from the OS page cache.
+        ts_data = pq.read_table(ts_path, columns=ts_columns, filters=[('is_ards', '==', True)],
+                                memory_map=True, use_threads=True).to_pandas(
+            categories=[col for col in CATEGORY_COLUMNS if col in ts_columns]
+        )
+        static_data = pq.read_table(static_path, columns=static_columns, memory_map=True, use_threads=True).to_pandas(
+            categories=[col for col in CATEGORY_COLUMNS if col in static_columns]
+        )
         
         # Convert datetime columns
         ts_data['recorded_dttm'] = pd.to_datetime(ts_data['recorded_dttm'])
@@ -277,39 +368,86 @@ def load_data():
         static_data['admission_datetime'] = pd.to_datetime(static_data['admission_datetime'])
         static_data['discharge_datetime'] = pd.to_datetime(static_data['discharge_datetime'])
         
-        # Filter to ARDS patients only (those with ARDS onset time)
-        ards_patients = ts_data[ts_data['ARDS_onset_dttm'].notna()]['hospitalization_id'].unique()
-        ts_data_ards = ts_data[ts_data['hospitalization_id'].isin(ards_patients)].copy()
-        static_data_ards = static_data[static_data['hospitalization_id'].isin(ards_patients)].copy()
+        # Coerce measurement columns to float once so cached data is already typed
+        for col in NUMERIC_COLS:
+            ts_data[col] = pd.to_numeric(ts_data[col], errors='coerce').astype('float32')
+        
+        # Calculate P/F ratio or S/F ratio for respiratory status
+        ts_data['pf_ratio'] = ts_data['pao2'] / ts_data['fio2_set']
+        ts_data['sf_ratio'] = ts_data['spo2'] / ts_data['fio2_set']
         
-        # Calculate time from ICU admission in hours for visualization
-        ts_data_ards['hours_from_icu_admission'] = (
-            ts_data_ards['recorded_dttm'] - ts_data_ards['icu_in_time']
-        ).dt.total_seconds() / 3600
+        # Use P/F if available, otherwise S/F
+        ts_data['respiratory_ratio'] = ts_data['pf_ratio'].fillna(ts_data['sf_ratio'])
         
-        # Calculate time from ARDS onset in hours
-        ts_data_ards.loc[ts_data_ards['ARDS_onset_dttm'].notna(), 'hours_from_ards_onset'] = (
-            ts_data_ards.loc[ts_data_ards['ARDS_onset_dttm'].notna(), 'recorded_dttm'] - 
-            ts_data_ards.loc[ts_data_ards['ARDS_onset_dttm'].notna(), 'ARDS_onset_dttm']
-        ).dt.total_seconds() / 3600
+        # Flag hours on any neuromuscular blocker infusion. The dose columns are already
+        # float32, so each is reduced in place without a copy (NaN > 0 is False).
+        nmb_flag = np.zeros(len(ts_data), dtype=bool)
+        for col in NMB_COLS:
+            nmb_flag |= ts_data[col].to_numpy() > 0
+        ts_data['_nmb_flag'] = nmb_flag
+        
+        # Flag prone position - check for both numeric 1 and string values "prone"/"Prone".
+        # prone_flag is categorical, so the check runs once per category and rows map by code.
+        if 'prone_flag' in ts_data.columns:
+            prone_flag = ts_data['prone_flag'].astype('category')
+            categories = prone_flag.cat.categories.astype(str).str.lower()
+            prone_categories = np.asarray((pd.to_numeric(categories, errors='coerce') == 1) | (categories == 'prone'), dtype=bool)
+            # Missing values have code -1, which picks the appended False
+            ts_data['_prone_flag'] = np.append(prone_categories, False)[prone_flag.cat.codes.to_numpy()]
+        else:
+            ts_data['_prone_flag'] = False
         
-        return ts_data_ards, static_data_ards
+        # Sort once and split into per-patient frames for O(1) lookup on rerun
+        ts_data = ts_data.sort_values(['hospitalization_id', 'recorded_dttm'])
+        patient_map = {hosp_id: group for hosp_id, group in ts_data.groupby('hospitalization_id', sort=False)}
+        
+        # Filter static data to ARDS patients, indexed by hospitalization ID (first row per patient)
+        static_data_ards = static_data[static_data['hospitalization_id'].isin(list(patient_map))]
+        static_data_ards = static_data_ards.drop_duplicates('hospitalization_id').set_index('hospitalization_id', drop=False)
+        
+        # Per-patient summary metrics and axis ranges, aggregated in one groupby pass
+        summary = ts_data.groupby('hospitalization_id', sort=False).agg(
+            days_max=('days_from_admission', 'max'),
+            ratio_min=('respiratory_ratio', 'min'),
+            ratio_max=('respiratory_ratio', 'max'),
+            peep_max=('peep_set', 'max'),
+            nmb_hours=('_nmb_flag', 'sum')
+        )
+        patient_summary = summary.to_dict('index')
+        
+        return patient_map, static_data_ards, patient_summary
     except Exception as e:
         st.error(f"Error loading data: {str(e)}")
         import traceback
         st.code(traceback.format_exc())
-        return None, None
+        return None, None, None
+
+@st.fragment
+def _render_patient(hosp_id, patient_ts, patient_static, summary):
+    """Render the main content area as a fragment, so widgets inside it rerun only this block"""
+    st.subheader(f"ARDS Patient {hosp_id} - Timeline Visualization")
+    
+    # Data check
+    if len(patient_ts) == 0:
+        st.warning("No time series data available for this patient.")
+    else:
+        # Create the main timeline visualization
+        create_patient_timeline(patient_ts, patient_static, summary)
+        
+        # Show data preview only on demand; toggling reruns just this fragment
+        if st.checkbox("📊 View Raw Data Sample"):
+            st.dataframe(patient_ts.head(10))
 
 # Load data
-ts_data, static_data = load_data()
+patient_map, static_data, patient_summary = load_data()
 
-if ts_data is not None and static_data is not None:
+if patient_map is not None and static_data is not None:
     # Sidebar for patient selection and static info
     with st.sidebar:
         st.header("Patient Selection")
         
         # Get unique hospitalization IDs
-        hosp_ids = sorted(static_data['hospitalization_id'].unique())
+        hosp_ids = sorted(static_data.index)
         
         # Patient selector
         selected_hosp_id = st.selectbox(
@@ -319,9 +457,8 @@ if ts_data is not None and static_data is not None:
         )
         
         # Get patient data
-        patient_static = static_data[static_data['hospitalization_id'] == selected_hosp_id].iloc[0]
-        patient_ts = ts_data[ts_data['hospitalization_id'] == selected_hosp_id].copy()
-        patient_ts = patient_ts.sort_values('recorded_dttm')
+        patient_static = static_data.loc[selected_hosp_id]
+        patient_ts = patient_map[selected_hosp_id]
         
         # Check if patient has ARDS
         has_ards = patient_ts['ARDS_onset_dttm'].notna().any()
@@ -346,15 +483,15 @@ if ts_data is not None and static_data is not None:
         admit_source = patient_static.get('hospital_admit_source', 'N/A')
         disposition = patient_static.get('disposition_category', 'N/A')
         
-        st.markdown(f"""
-        <div class="patient-info-card">
-            <b>Age:</b> {age}<br>
-            <b>Sex:</b> {sex}<br>
-            <b>Ethnicity:</b> {ethnicity}<br>
-            <b>Admit Source:</b> {admit_source}<br>
-            <b>Disposition:</b> {disposition}
-        </div>
-        """, unsafe_allow_html=True)
+        # Native bordered container styled by the .st-key-patient_info_card CSS rule
+        with st.container(border=True, key="patient_info_card"):
+            st.markdown(
+                f"**Age:** {age}  \n"
+                f"**Sex:** {sex}  \n"
+                f"**Ethnicity:** {ethnicity}  \n"
+                f"**Admit Source:** {admit_source}  \n"
+                f"**Disposition:** {disposition}"
+            )
         
         # Outcomes
         st.markdown("### Outcomes")
@@ -372,18 +509,7 @@ if ts_data is not None and static_data is not None:
             st.success("✓ Survived")
     
     # Main content area
-    st.subheader(f"ARDS Patient {selected_hosp_id} - Timeline Visualization")
-    
-    # Data check
-    if len(patient_ts) == 0:
-        st.warning("No time series data available for this patient.")
-    else:
-        # Create the main timeline visualization
-        create_patient_timeline(patient_ts, patient_static)
-        
-        # Show data preview
-        with st.expander("📊 View Raw Data Sample"):
-            st.dataframe(patient_ts.head(10))
+    _render_patient(selected_hosp_id, patient_ts, patient_static, patient_summary[selected_hosp_id])
         
 else:
     st.error("Failed to load data. Please check the data files exist in the correct location.")
\ No newline at end of file
@@ -0,0 +1,50 @@
+"""Precompute dashboard columns (time offsets, ARDS flag) in the time series parquet.
+
+Run once after exporting the analysis tables, before launching the dashboard:
+
+    python prepare_data.py [--data-path DIR]
+"""
+import argparse
+import os
+
+import pandas as pd
+
+# Define data paths (override with the ARDS_DATA_PATH environment variable)
+DATA_PATH = os.environ.get('ARDS_DATA_PATH', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data'))
+
+def add_time_columns(ts_data):
+    """Add float32 hour/day offsets from ICU admission and ARDS onset"""
+    recorded = pd.to_datetime(ts_data['recorded_dttm'])
+    icu_in = pd.to_datetime(ts_data['icu_in_time'])
+    ards_onset = pd.to_datetime(ts_data['ARDS_onset_dttm'])
+
+    # Time from ICU admission in hours, and in days for display
+    hours_from_icu_admission = (recorded - icu_in).dt.total_seconds() / 3600
+    ts_data['hours_from_icu_admission'] = hours_from_icu_admission.astype('float32')
+    ts_data['days_from_admission'] = (hours_from_icu_admission / 24).astype('float32')
+
+    # Time from ARDS onset in hours (NaN for rows without an onset time)
+    ts_data['hours_from_ards_onset'] = ((recorded - ards_onset).dt.total_seconds() / 3600).astype('float32')
+
+    return ts_data
+
+def add_ards_flag(ts_data):
+    """Flag every row of hospitalizations that have an ARDS onset time"""
+    has_onset = pd.to_datetime(ts_data['ARDS_onset_dttm']).notna()
+    ts_data['is_ards'] = has_onset.groupby(ts_data['hospitalization_id']).transform('any').astype(bool)
+    return ts_data
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data-path', default=DATA_PATH, help='Directory containing the analysis parquet files')
+    args = parser.parse_args()
+
+    ts_path = os.path.join(args.data_path, 'time_series_analysis_table.parquet')
+    ts_data = pd.read_parquet(ts_path, engine='pyarrow')
+    ts_data = add_time_columns(ts_data)
+    ts_data = add_ards_flag(ts_data)
+    ts_data.to_parquet(ts_path, engine='pyarrow', index=False)
+    print(f"Wrote {len(ts_data):,} rows to {ts_path}")
+
+if __name__ == '__main__':
+    main()